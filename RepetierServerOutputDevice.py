@@ -8,15 +8,75 @@ from UM.Util import parseBool
 from cura.PrinterOutputDevice import PrinterOutputDevice, ConnectionState
 
 from PyQt5.QtNetwork import QHttpMultiPart, QHttpPart, QNetworkRequest, QNetworkAccessManager, QNetworkReply
-from PyQt5.QtCore import QUrl, QTimer, pyqtSignal, pyqtProperty, pyqtSlot, QCoreApplication
+from PyQt5.QtCore import QUrl, QTimer, pyqtSignal, pyqtProperty, pyqtSlot, QThread, QThreadPool, QRunnable, QFile, QIODevice
 from PyQt5.QtGui import QImage, QDesktopServices
 
 import json
+import math
+import os
+import tempfile
 from time import time
 
+try:
+    # orjson is a lot faster than the json module and parses bytes directly, but is not always available.
+    from orjson import loads as _loadJson
+except ImportError:
+    def _loadJson(data):
+        return json.loads(data.decode("utf-8"))
+
 i18n_catalog = i18nCatalog("cura")
 
 
+##  Spools a list of G-code lines into a temporary file on a separate thread.
+#   Emits ready with the path of the file and the name to upload it as, or failed with an error description.
+class GcodeUploadWorker(QThread):
+    ready = pyqtSignal(str, str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, gcode, file_name, parent = None):
+        super().__init__(parent)
+        self._gcode = gcode
+        self._file_name = file_name
+
+    def run(self):
+        try:
+            file_descriptor, file_path = tempfile.mkstemp(suffix = ".gcode")
+        except OSError as e:
+            self._gcode = None
+            self.failed.emit(str(e))
+            return
+
+        try:
+            with os.fdopen(file_descriptor, "wb") as f:
+                file_data = bytearray()
+                append = file_data.extend
+                for line_count, line in enumerate(self._gcode):
+                    append(line.encode("utf-8"))
+                    if (line_count & 0xFFFF) == 0:  # Flush every 64k lines
+                        f.write(file_data)
+                        del file_data[:]
+                f.write(file_data)
+        except Exception as e:
+            os.remove(file_path)
+            self.failed.emit(str(e))
+            return
+        finally:
+            self._gcode = None
+
+        self.ready.emit(file_path, self._file_name)
+
+
+##  Decodes a camera snapshot on a thread pool thread and passes the resulting QImage to the callback.
+class ImageDecodeTask(QRunnable):
+    def __init__(self, data, callback):
+        super().__init__()
+        self._data = data
+        self._callback = callback
+
+    def run(self):
+        self._callback(QImage.fromData(self._data))
+
+
 ##  Repetier-Server connected (wifi / lan) printer using the Repetier-Server API
 @signalemitter
 class RepetierServerOutputDevice(PrinterOutputDevice):
@@ -28,6 +88,10 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._path = properties["path"] if "path" in properties else "/"
         self._key = key
         self._properties = properties  # Properties dict as provided by zero conf
+        # Decoded copy of the properties, so lookups from QML don't need to encode/decode each time.
+        self._properties_str = {(k.decode("utf-8", errors = "replace") if isinstance(k, bytes) else k):
+                                (v.decode("utf-8", errors = "replace") if isinstance(v, bytes) else v)
+                                for k, v in self._properties.items()}
 
         self._gcode = None
         self._auto_print = True
@@ -40,11 +104,18 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._api_prefix = "printer/api/" + self._slug
         self._api_header = "X-Api-Key"
         self._api_key = None
+        self._api_header_b = self._api_header.encode("ascii")
+        self._api_key_b = b""
 
         self._base_url = "http://%s:%d%s" % (self._address, self._port, self._path)
         self._api_url = self._base_url + self._api_prefix
         self._model_url = self._base_url + "printer/model/" + self._slug + "?a=upload"
         self._camera_url = "http://%s:8080/?action=snapshot" % self._address
+        self._state_url = QUrl(self._api_url + "?a=stateList")
+        self._list_url = QUrl(self._api_url + "?a=listPrinter")
+        self._url_stop = QUrl(self._api_url + "?a=stopJob")
+        self._url_continue = QUrl(self._api_url + "?a=continueJob")
+        self._url_pause = QUrl(self._api_url + "?a=send&data=" + json.dumps({"cmd": "@pause"}, separators = (",", ":")))
 
         self.setPriority(2) # Make sure the output device gets selected above local file output
         self.setName(key)
@@ -59,6 +130,8 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._manager.finished.connect(self._onRequestFinished)
 
         ##  Hack to ensure that the qt networking stuff isn't garbage collected (unless we want it to)
+        self._state_request = None
+        self._state_reply = None
         self._printer_request = None
         self._printer_reply = None
 
@@ -72,10 +145,30 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._post_reply = None
         self._post_multi_part = None
         self._post_part = None
+        self._post_file = None
+        self._post_file_path = None
+
+        self._upload_worker = None
 
         self._job_request = None
         self._job_reply = None
 
+        self._state_in_flight = False
+        self._job_in_flight = False
+        self._state_request_time = 0
+        self._job_request_time = 0
+
+        ##  Kind of each pending reply, used to pick the handler once it has finished.
+        #   Keeping the reply as key also keeps its python wrapper (and thus its identity) alive.
+        self._reply_kinds = {}
+        self._reply_handlers = {
+            "state": self._onStateReply,
+            "list": self._onListPrinterReply,
+            "snapshot": self._onSnapshotReply,
+            "model": self._onModelUploadReply,
+            "job": self._onCommandReply
+        }
+
         self._command_request = None
         self._command_reply = None
 
@@ -83,15 +176,25 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._error_message = None
         self._connection_message = None
 
+        ##  The update timer is restarted once both polling replies have finished. The interval backs off while the
+        #   instance is not answering properly, and is reset on the first correct answer.
         self._update_timer = QTimer()
-        self._update_timer.setInterval(2000)  # TODO; Add preference for update interval
-        self._update_timer.setSingleShot(False)
+        self._update_interval = 2000  # TODO; Add preference for update interval
+        self._max_update_interval = 8000
+        self._current_update_interval = self._update_interval
+        self._update_cycle_failed = False
+        self._update_timer.setSingleShot(True)
         self._update_timer.timeout.connect(self._update)
 
+        ##  The camera timer is restarted each time a snapshot reply has finished, so only one snapshot request is in
+        #   flight at a time and the interval is the minimum time between snapshots.
         self._camera_timer = QTimer()
         self._camera_timer.setInterval(500)  # Todo: Add preference for camera update interval
-        self._camera_timer.setSingleShot(False)
+        self._camera_timer.setSingleShot(True)
         self._camera_timer.timeout.connect(self._update_camera)
+        self._camera_active = False
+        self._camera_in_flight = False
+        self._snapshotDecoded.connect(self._onSnapshotDecoded)
 
         self._camera_image_id = 0
 
@@ -105,16 +208,14 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._recreate_network_manager_time = 30 # If we have no connection, re-create network manager every 30 sec.
         self._recreate_network_manager_count = 1
 
+        self._createPollRequests()
+
     def getProperties(self):
         return self._properties
 
     @pyqtSlot(str, result = str)
     def getProperty(self, key):
-        key = key.encode("utf-8")
-        if key in self._properties:
-            return self._properties.get(key, b"").decode("utf-8")
-        else:
-            return ""
+        return self._properties_str.get(key, "")
 
     ##  Get the unique key of this machine
     #   \return key String containing the key of the machine.
@@ -125,6 +226,16 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
     ##  Set the API key of this Repetier-Server instance
     def setApiKey(self, api_key):
         self._api_key = api_key
+        self._api_key_b = api_key.encode("ascii")
+        self._createPollRequests()
+
+    ##  (Re)create the requests used for polling, so they don't have to be rebuilt for every update
+    def _createPollRequests(self):
+        self._state_request = self._createRequest(self._state_url)
+        self._state_request.setRawHeader(self._api_header_b, self._api_key_b)
+        self._job_request = self._createRequest(self._list_url)
+        self._job_request.setRawHeader(self._api_header_b, self._api_key_b)
+        self._image_request = self._createRequest(QUrl(self._camera_url))
 
     ##  Name of the instance (as returned from the zeroConf properties)
     @pyqtProperty(str, constant = True)
@@ -134,7 +245,7 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
     ##  Version (as returned from the zeroConf properties)
     @pyqtProperty(str, constant=True)
     def octoprintVersion(self):
-        return self._properties.get(b"version", b"").decode("utf-8")
+        return self._properties_str.get("version", "")
 
     ## IPadress of this instance
     @pyqtProperty(str, constant=True)
@@ -156,13 +267,37 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
     def baseURL(self):
         return self._base_url
 
+    ##  Create a request that may reuse the connection of previous requests, instead of setting up a new connection
+    #   for every poll.
+    def _createRequest(self, url):
+        request = QNetworkRequest(url)
+        if hasattr(QNetworkRequest, "Http2AllowedAttribute"):  # Only available as of Qt 5.8
+            request.setAttribute(QNetworkRequest.Http2AllowedAttribute, True)
+        request.setAttribute(QNetworkRequest.HttpPipeliningAllowedAttribute, True)
+        request.setRawHeader(b"Connection", b"keep-alive")
+        return request
+
     def _update_camera(self):
+        if self._camera_in_flight:
+            return
         ## Request new image
-        url = QUrl(self._camera_url)
-        self._image_request = QNetworkRequest(url)
+        self._camera_in_flight = True
         self._image_reply = self._manager.get(self._image_request)
+        self._reply_kinds[self._image_reply] = "snapshot"
+        self._image_reply.finished.connect(self._onCameraReplyFinished)
+
+    ##  Schedule the next snapshot once the previous one has been answered (or has failed)
+    def _onCameraReplyFinished(self):
+        if self.sender() is not self._image_reply:
+            return  # Reply of a previous network manager
+        self._camera_in_flight = False
+        if self._camera_active:
+            self._camera_timer.start()
 
     def _update(self):
+        # Make sure we keep updating even if the replies never arrive; the next update aborts replies that hang.
+        self._update_timer.start(self._max_update_interval)
+
         if self._last_response_time:
             time_since_last_response = time() - self._last_response_time
         else:
@@ -177,11 +312,10 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         # Re-creating the QNetworkManager seems to fix this issue.
         if self._last_response_time and self._connection_state_before_timeout:
             if time_since_last_response > self._recreate_network_manager_time * self._recreate_network_manager_count:
-                self._recreate_network_manager_count += 1
                 # It can happen that we had a very long timeout (multiple times the recreate time).
                 # In that case we should jump through the point that the next update won't be right away.
-                while time_since_last_response - self._recreate_network_manager_time * self._recreate_network_manager_count > self._recreate_network_manager_time:
-                    self._recreate_network_manager_count += 1
+                self._recreate_network_manager_count = max(self._recreate_network_manager_count + 1,
+                                                           math.ceil(time_since_last_response / self._recreate_network_manager_time) - 1)
                 Logger.log("d", "Timeout lasted over 30 seconds (%.1fs), re-checking connection.", time_since_last_response)
                 self._createNetworkManager()
                 return
@@ -207,6 +341,7 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
 
                         self._post_reply.abort()
                         self._progress_message.hide()
+                        self._releasePostFile()
                 except RuntimeError:
                     self._post_reply = None  # It can happen that the wrapped c++ object is already deleted.
             return
@@ -224,19 +359,61 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
                 self._connection_message.show()
                 self.setConnectionState(ConnectionState.error)
 
+        # Abort polls that have been waiting for an answer for too long (eg. on a dead keep-alive connection), so they
+        # don't block all further polling. Aborting emits finished, which clears the in-flight flag.
+        now = time()
+        if self._state_in_flight and now - self._state_request_time > self._response_timeout_time:
+            Logger.log("d", "Aborting stateList request that did not finish in time")
+            self._state_reply.abort()
+        if self._job_in_flight and now - self._job_request_time > self._response_timeout_time:
+            Logger.log("d", "Aborting listPrinter request that did not finish in time")
+            self._job_reply.abort()
+
         ## Request 'general' printer data
-        urlString = self._api_url + "?a=stateList" 
-        #Logger.log("d","XXX URL: " + urlString)
-        url = QUrl(urlString)
-        self._printer_request = QNetworkRequest(url)
-        self._printer_request.setRawHeader(self._api_header.encode(), self._api_key.encode())
-        self._printer_reply = self._manager.get(self._printer_request)
+        # Skip requests that are still waiting for an answer, so a slow instance doesn't pile up requests.
+        if not self._state_in_flight:
+            self._state_in_flight = True
+            self._state_request_time = self._last_request_time = now
+            self._state_reply = self._manager.get(self._state_request)
+            self._reply_kinds[self._state_reply] = "state"
+            self._state_reply.finished.connect(self._onStateReplyFinished)
 
         ## Request print_job data
-        url = QUrl(self._api_url + "?a=listPrinter")
-        self._job_request = QNetworkRequest(url)
-        self._job_request.setRawHeader(self._api_header.encode(), self._api_key.encode())
-        self._job_reply = self._manager.get(self._job_request)
+        if not self._job_in_flight:
+            self._job_in_flight = True
+            self._job_request_time = self._last_request_time = now
+            self._job_reply = self._manager.get(self._job_request)
+            self._reply_kinds[self._job_reply] = "list"
+            self._job_reply.finished.connect(self._onJobReplyFinished)
+
+    def _onStateReplyFinished(self):
+        if self.sender() is not self._state_reply:
+            return  # Reply of a previous network manager
+        self._state_in_flight = False
+        self._onPollReplyFinished(self._state_reply)
+
+    def _onJobReplyFinished(self):
+        if self.sender() is not self._job_reply:
+            return  # Reply of a previous network manager
+        self._job_in_flight = False
+        self._onPollReplyFinished(self._job_reply)
+
+    ##  Schedule the next update once both polling replies of this cycle have returned
+    def _onPollReplyFinished(self, reply):
+        if reply.error() != QNetworkReply.NoError:
+            self._update_cycle_failed = True
+
+        if self._state_in_flight or self._job_in_flight:
+            return
+
+        if self._update_cycle_failed:
+            self._current_update_interval = min(self._current_update_interval * 2, self._max_update_interval)
+        else:
+            self._current_update_interval = self._update_interval
+        self._update_cycle_failed = False
+
+        if self._connection_state != ConnectionState.closed:
+            self._update_timer.start(self._current_update_interval)
 
     def _createNetworkManager(self):
         if self._manager:
@@ -245,6 +422,20 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._manager = QNetworkAccessManager()
         self._manager.finished.connect(self._onRequestFinished)
 
+        # Don't wait for the requests of the previous manager. Their replies may still finish later, but are ignored
+        # as they are no longer the current replies.
+        self._reply_kinds = {}
+        self._state_reply = None
+        self._job_reply = None
+        self._image_reply = None
+        self._state_in_flight = False
+        self._job_in_flight = False
+        self._camera_in_flight = False
+        self._update_cycle_failed = False
+        self._current_update_interval = self._update_interval
+        if self._camera_active and not self._camera_timer.isActive():
+            self._camera_timer.start()
+
     def close(self):
         self._updateJobState("")
         self.setConnectionState(ConnectionState.closed)
@@ -253,9 +444,11 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         if self._error_message:
             self._error_message.hide()
         self._update_timer.stop()
+        self._camera_active = False
         self._camera_timer.stop()
         self._camera_image = QImage()
         self.newImage.emit()
+        self._releasePostFile()
 
     def requestWrite(self, node, file_name = None, filter_by_machine = False):
         self.writeStarted.emit(self)
@@ -279,12 +472,12 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self._update()  # Manually trigger the first update, as we don't want to wait a few secs before it starts.
 
         Logger.log("d", "Connection with instance %s with ip %s started", self._key, self._address)
-        self._update_timer.start()
 
         if parseBool(global_container_stack.getMetaDataEntry("octoprint_show_camera", False)):
+            self._camera_active = True
             self._update_camera()
-            self._camera_timer.start()
         else:
+            self._camera_active = False
             self._camera_timer.stop()
             self._camera_image = QImage()
             self.newImage.emit()
@@ -299,6 +492,7 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         self.close()
 
     newImage = pyqtSignal()
+    _snapshotDecoded = pyqtSignal(QImage)
 
     @pyqtProperty(QUrl, notify = newImage)
     def cameraImage(self):
@@ -324,28 +518,21 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
         # elif job_state == "pause":
         #     command = "pause"
 
-        urlString = ""
+        url = None
         if job_state == "abort":
-            command = "cancel"
-            urlString = self._api_url + '?a=stopJob'
+            url = self._url_stop
         elif job_state == "print":
             if self.jobState == "paused":
-                command = "pause"
-                urlString = self._api_url + '?a=send&data={"cmd":"@pause"}'
+                url = self._url_pause
             else:
-                command = "start"
-                urlString = self._api_url + '?a=continueJob'
+                url = self._url_continue
         elif job_state == "pause":
-            command = "pause"
-            urlString = self._api_url + '?a=send&data={"cmd":"@pause"}'
-
-        Logger.log("d","XXX:Command:" + command)
-        Logger.log("d","XXX:Command:" + urlString)
-        
-        if urlString:
-            url = QUrl(urlString)
-            self._printer_request = QNetworkRequest(url)
-            self._printer_request.setRawHeader(self._api_header.encode(), self._api_key.encode())
+            url = self._url_pause
+
+        if url:
+            Logger.log("d", "Setting job state to %s: %s", job_state, url.toString())
+            self._printer_request = self._createRequest(url)
+            self._printer_request.setRawHeader(self._api_header_b, self._api_key_b)
             self._printer_reply = self._manager.get(self._printer_request)
         # if command:
         #     self._sendCommand(command)
@@ -363,21 +550,33 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
             self._error_message = Message(i18n_catalog.i18nc("@info:status", "Repetier-Server is printing. Unable to start a new job."))
             self._error_message.show()
             return
-        try:
-            self._progress_message = Message(i18n_catalog.i18nc("@info:status", "Sending data to Repetier-Server"), 0, False, -1)
-            self._progress_message.show()
+        if (self._upload_worker is not None and self._upload_worker.isRunning()) or (self._post_reply is not None and self._post_reply.isRunning()):
+            self._error_message = Message(i18n_catalog.i18nc("@info:status", "A previous job is still being sent to Repetier-Server. Unable to start a new job."))
+            self._error_message.show()
+            return
+
+        self._progress_message = Message(i18n_catalog.i18nc("@info:status", "Sending data to Repetier-Server"), 0, False, -1)
+        self._progress_message.show()
+
+        file_name = "%s.gcode" % Application.getInstance().getPrintInformation().jobName
 
-            ## Mash the data into single string
-            single_string_file_data = ""
-            last_process_events = time()
-            for line in self._gcode:
-                single_string_file_data += line
-                if time() > last_process_events + 0.05:
-                    # Ensure that the GUI keeps updated at least 20 times per second.
-                    QCoreApplication.processEvents()
-                    last_process_events = time()
+        ##  Assemble the G-code on a worker thread, so the GUI stays responsive for large files.
+        #   The network request itself is set up in _onUploadFileReady, as QNetworkAccessManager is not thread-safe.
+        self._upload_worker = GcodeUploadWorker(self._gcode, file_name)
+        self._upload_worker.ready.connect(self._onUploadFileReady)
+        self._upload_worker.failed.connect(self._onUploadFileFailed)
+        self._upload_worker.finished.connect(self._onUploadWorkerFinished)
+        self._upload_worker.start()
 
-            file_name = "%s.gcode" % Application.getInstance().getPrintInformation().jobName
+        self._gcode = None
+
+    ##  Called on the GUI thread once the worker has spooled the G-code to disk
+    def _onUploadFileReady(self, file_path, file_name):
+        try:
+            self._post_file_path = file_path
+            self._post_file = QFile(file_path)
+            if not self._post_file.open(QIODevice.ReadOnly):
+                raise IOError("Unable to open %s for upload" % file_path)
 
             ##  Create multi_part request
             self._post_multi_part = QHttpMultiPart(QHttpMultiPart.FormDataType)
@@ -396,7 +595,7 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
 
             self._post_part = QHttpPart()
             self._post_part.setHeader(QNetworkRequest.ContentDispositionHeader, "form-data; filename=\"%s\"" % file_name)
-            self._post_part.setBody(single_string_file_data.encode())
+            self._post_part.setBodyDevice(self._post_file)
             self._post_multi_part.append(self._post_part)
 
             # destination = "local"
@@ -407,31 +606,62 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
             url = QUrl(self._model_url + "&name=" + file_name)
 
             ##  Create the QT request
-            self._post_request = QNetworkRequest(url)
-            self._post_request.setRawHeader(self._api_header.encode(), self._api_key.encode())
+            self._post_request = self._createRequest(url)
+            self._post_request.setRawHeader(self._api_header_b, self._api_key_b)
 
             ##  Post request + data
             self._post_reply = self._manager.post(self._post_request, self._post_multi_part)
+            self._reply_kinds[self._post_reply] = "model"
             self._post_reply.uploadProgress.connect(self._onUploadProgress)
-
-            self._gcode = None
+            self._post_reply.finished.connect(self._onPostReplyFinished)
 
         except IOError:
             self._progress_message.hide()
+            self._releasePostFile()
             self._error_message = Message(i18n_catalog.i18nc("@info:status", "Unable to send data to Repetier-Server."))
             self._error_message.show()
         except Exception as e:
             self._progress_message.hide()
+            self._releasePostFile()
             Logger.log("e", "An exception occurred in network connection: %s" % str(e))
 
+    ##  The thread has stopped running, so it is now safe to drop it
+    def _onUploadWorkerFinished(self):
+        if self.sender() is self._upload_worker:
+            self._upload_worker = None
+
+    def _onUploadFileFailed(self, error):
+        Logger.log("e", "Unable to prepare G-code for upload: %s", error)
+        self._progress_message.hide()
+        self._error_message = Message(i18n_catalog.i18nc("@info:status", "Unable to send data to Repetier-Server."))
+        self._error_message.show()
+
+    ##  Clean up the upload file however the upload ended, including errors that never get a status code
+    def _onPostReplyFinished(self):
+        if self.sender() is self._post_reply:
+            self._releasePostFile()
+
+    ##  Close and remove the temporary file the last upload was streamed from
+    def _releasePostFile(self):
+        if self._post_file:
+            self._post_file.close()
+            self._post_file = None
+        if self._post_file_path:
+            try:
+                os.remove(self._post_file_path)
+            except OSError:
+                pass
+            self._post_file_path = None
+
     def _sendCommand(self, command):
         url = QUrl(self._api_url + "job")
-        self._command_request = QNetworkRequest(url)
-        self._command_request.setRawHeader(self._api_header.encode(), self._api_key.encode())
+        self._command_request = self._createRequest(url)
+        self._command_request.setRawHeader(self._api_header_b, self._api_key_b)
         self._command_request.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
 
-        data = "{\"command\": \"%s\"}" % command
+        data = json.dumps({"command": command})
         self._command_reply = self._manager.post(self._command_request, data.encode())
+        self._reply_kinds[self._command_reply] = "job"
         Logger.log("d", "Sent command to Repetier-Server instance: %s", data)
 
     def _setTargetBedTemperature(self, temperature):
@@ -467,6 +697,8 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
 
     ##  Handler for all requests that have finished.
     def _onRequestFinished(self, reply):
+        kind = self._reply_kinds.pop(reply, None)
+
         if reply.error() == QNetworkReply.TimeoutError:
             Logger.log("w", "Received a timeout on a request to the instance")
             self._connection_state_before_timeout = self._connection_state
@@ -487,145 +719,173 @@ class RepetierServerOutputDevice(PrinterOutputDevice):
             # Received no or empty reply
             return
 
-        if reply.operation() == QNetworkAccessManager.GetOperation:
-            if "stateList" in reply.url().toString():  # Status update from /printer.
-                if http_status_code == 200:
-                    if not self.acceptsCommands:
-                        self.setAcceptsCommands(True)
-                        self.setConnectionText(i18n_catalog.i18nc("@info:status", "Connected to Repetier-Server on {0}").format(self._key))
-
-                    if self._connection_state == ConnectionState.connecting:
-                        self.setConnectionState(ConnectionState.connected)
-                    json_data = json.loads(bytes(reply.readAll()).decode("utf-8"))
-
-                    if not self._num_extruders_set:
-                        self._num_extruders = 0
-                        ## TODO
-                        # while "extruder" % self._num_extruders in json_data[self._slug]:
-                        #     self._num_extruders = self._num_extruders + 1
-
-                        # Reinitialise from PrinterOutputDevice to match the new _num_extruders
-                        # self._hotend_temperatures = [0] * self._num_extruders
-                        # self._target_hotend_temperatures = [0] * self._num_extruders
-                        # self._num_extruders_set = True
-                        # TODO
-
-                    # Check for hotend temperatures
-                    # for index in range(0, self._num_extruders):
-                    #     temperature = json_data[self._slug]["extruder"]["tempRead"]
-                    #     self._setHotendTemperature(index, temperature)
-                    temperature = json_data[self._slug]["extruder"][0]["tempRead"]
-                    self._setHotendTemperature(0, temperature)
-
-                    bed_temperature = json_data[self._slug]["heatedBed"]["tempRead"]
-                    #bed_temperature_set = json_data[self._slug]["heatedBed"]["tempSet"]
-                    self._setBedTemperature(bed_temperature)
-
-                elif http_status_code == 401:
-                    self.setAcceptsCommands(False)
-                    self.setConnectionText(i18n_catalog.i18nc("@info:status", "Repetier-Server on {0} does not allow access to print").format(self._key))
-                else:
-                    pass  # TODO: Handle errors
-
-            elif "listPrinter" in reply.url().toString():  # Status update from /job:
-                if http_status_code == 200:
-                    json_data = json.loads(bytes(reply.readAll()).decode("utf-8"))
-
-                    for printer in json_data:
-                        if printer["slug"]==self._slug:
-                                
-                            job_name = printer["job"]
-                            self.setJobName(job_name)
-
-                            job_state = "offline"
-                            # if printer["state"]["flags"]["error"]:
-                            #     job_state = "error"
-                            if printer["paused"] == "true":
-                                job_state = "paused"
-                            elif job_name != "none":
-                                job_state = "printing"
-                                self.setProgress(printer["done"])
-                            elif job_name == "none":    
-                                job_state = "ready"                                
-                            self._updateJobState(job_state)
-
-                    # progress = json_data["progress"]["completion"]
-                    # if progress:
-                    #     self.setProgress(progress)
-
-                    # if json_data["progress"]["printTime"]:
-                    #     self.setTimeElapsed(json_data["progress"]["printTime"])
-                    #     if json_data["progress"]["printTimeLeft"]:
-                    #         self.setTimeTotal(json_data["progress"]["printTime"] + json_data["progress"]["printTimeLeft"])
-                    #     elif json_data["job"]["estimatedPrintTime"]:
-                    #         self.setTimeTotal(max(json_data["job"]["estimatedPrintTime"], json_data["progress"]["printTime"]))
-                    #     elif progress > 0:
-                    #         self.setTimeTotal(json_data["progress"]["printTime"] / (progress / 100))
-                    #     else:
-                    #         self.setTimeTotal(0)
-                    # else:
-                    #     self.setTimeElapsed(0)
-                    #     self.setTimeTotal(0)
-                    # self.setJobName(json_data["job"]["file"]["name"])
-                else:
-                    pass  # TODO: Handle errors
-
-            elif "snapshot" in reply.url().toString():  # Update from camera:
-                if http_status_code == 200:
-                    self._camera_image.loadFromData(reply.readAll())
-                    self.newImage.emit()
-                else:
-                    pass  # TODO: Handle errors
-
-        elif reply.operation() == QNetworkAccessManager.PostOperation:
-            if "model" in reply.url().toString():  # Result from /files command:
-                if http_status_code == 201:
-                    Logger.log("d", "Resource created on Repetier-Server instance: %s", reply.header(QNetworkRequest.LocationHeader).toString())
-                else:
-                    pass  # TODO: Handle errors
-
-                json_data = json.loads(bytes(reply.readAll()).decode("utf-8"))
-
-                modelList = json_data["data"];
-
-                
-                lastModel = modelList[len(modelList)-1]
-                # Logger.log("d", "XXX1:len"+str(len(modelList)))
-                # Logger.log("d", "XXX1:lastModel"+str(lastModel))
-                modelId = lastModel["id"]
-
-                # "http://%s:%d%s" % (self._address, self._port, self._path)
-                urlString = self._api_url + '?a=copyModel&data={"id": %s}' % (modelId) 
-                Logger.log("d", "XXX1: modelId: "+str(modelId))
-                url = QUrl(urlString)
-                self._printer_request = QNetworkRequest(url)
-                self._printer_request.setRawHeader(self._api_header.encode(), self._api_key.encode())
-                self._printer_reply = self._manager.get(self._printer_request)
-                Logger.log("d", "XXX1: modelId: "+str(urlString))
-
-                reply.uploadProgress.disconnect(self._onUploadProgress)
-                self._progress_message.hide()
-                global_container_stack = Application.getInstance().getGlobalContainerStack()
-                if not self._auto_print:
-                    location = reply.header(QNetworkRequest.LocationHeader)
-                    if location:
-                        file_name = QUrl(reply.header(QNetworkRequest.LocationHeader).toString()).fileName()
-                        message = Message(i18n_catalog.i18nc("@info:status", "Saved to Repetier-Server as {0}").format(file_name))
-                    else:
-                        message = Message(i18n_catalog.i18nc("@info:status", "Saved to Repetier-Server"))
-                    message.addAction("open_browser", i18n_catalog.i18nc("@action:button", "Open Repetier-Server..."), "globe",
-                                        i18n_catalog.i18nc("@info:tooltip", "Open the Repetier-Server web interface"))
-                    message.actionTriggered.connect(self._onMessageActionTriggered)
-                    message.show()
-
-            elif "job" in reply.url().toString():  # Result from /job command:
-                if http_status_code == 204:
-                    Logger.log("d", "Repetier-Server command accepted")
-                else:
-                    pass  # TODO: Handle errors
+        handler = self._reply_handlers.get(kind)
+        if handler:
+            handler(reply, http_status_code)
+
+    ##  Status update from ?a=stateList
+    def _onStateReply(self, reply, http_status_code):
+        if http_status_code == 200:
+            if not self.acceptsCommands:
+                self.setAcceptsCommands(True)
+                self.setConnectionText(i18n_catalog.i18nc("@info:status", "Connected to Repetier-Server on {0}").format(self._key))
+
+            if self._connection_state == ConnectionState.connecting:
+                self.setConnectionState(ConnectionState.connected)
+            json_data = _loadJson(reply.readAll().data())
+
+            if not self._num_extruders_set:
+                self._num_extruders = 0
+                ## TODO
+                # while "extruder" % self._num_extruders in json_data[self._slug]:
+                #     self._num_extruders = self._num_extruders + 1
+
+                # Reinitialise from PrinterOutputDevice to match the new _num_extruders
+                # self._hotend_temperatures = [0] * self._num_extruders
+                # self._target_hotend_temperatures = [0] * self._num_extruders
+                # self._num_extruders_set = True
+                # TODO
+
+            # Check for hotend temperatures
+            # for index in range(0, self._num_extruders):
+            #     temperature = json_data[self._slug]["extruder"]["tempRead"]
+            #     self._setHotendTemperature(index, temperature)
+            temperature = json_data[self._slug]["extruder"][0]["tempRead"]
+            self._setHotendTemperature(0, temperature)
+
+            bed_temperature = json_data[self._slug]["heatedBed"]["tempRead"]
+            #bed_temperature_set = json_data[self._slug]["heatedBed"]["tempSet"]
+            self._setBedTemperature(bed_temperature)
+
+        elif http_status_code == 401:
+            self.setAcceptsCommands(False)
+            self.setConnectionText(i18n_catalog.i18nc("@info:status", "Repetier-Server on {0} does not allow access to print").format(self._key))
+        else:
+            pass  # TODO: Handle errors
+
+    ##  Status update from ?a=listPrinter
+    def _onListPrinterReply(self, reply, http_status_code):
+        if http_status_code == 200:
+            json_data = _loadJson(reply.readAll().data())
+
+            for printer in json_data:
+                if printer["slug"]==self._slug:
+
+                    job_name = printer["job"]
+                    self.setJobName(job_name)
+
+                    job_state = "offline"
+                    # if printer["state"]["flags"]["error"]:
+                    #     job_state = "error"
+                    if printer["paused"] == "true":
+                        job_state = "paused"
+                    elif job_name != "none":
+                        job_state = "printing"
+                        self.setProgress(printer["done"])
+                    elif job_name == "none":    
+                        job_state = "ready"                                
+                    self._updateJobState(job_state)
+
+            # progress = json_data["progress"]["completion"]
+            # if progress:
+            #     self.setProgress(progress)
+
+            # if json_data["progress"]["printTime"]:
+            #     self.setTimeElapsed(json_data["progress"]["printTime"])
+            #     if json_data["progress"]["printTimeLeft"]:
+            #         self.setTimeTotal(json_data["progress"]["printTime"] + json_data["progress"]["printTimeLeft"])
+            #     elif json_data["job"]["estimatedPrintTime"]:
+            #         self.setTimeTotal(max(json_data["job"]["estimatedPrintTime"], json_data["progress"]["printTime"]))
+            #     elif progress > 0:
+            #         self.setTimeTotal(json_data["progress"]["printTime"] / (progress / 100))
+            #     else:
+            #         self.setTimeTotal(0)
+            # else:
+            #     self.setTimeElapsed(0)
+            #     self.setTimeTotal(0)
+            # self.setJobName(json_data["job"]["file"]["name"])
+        else:
+            pass  # TODO: Handle errors
+
+    ##  Update from camera
+    def _onSnapshotReply(self, reply, http_status_code):
+        if not self._camera_active:
+            return  # Nobody is looking at the camera image, so don't bother decoding it.
+
+        if http_status_code == 200:
+            # The QByteArray is implicitly shared, so handing it to the decoder doesn't copy the image data again.
+            data = reply.readAll()
+            if data.isEmpty():
+                return
+            # Decode the image on the thread pool, so the GUI thread doesn't have to run the image decoder.
+            QThreadPool.globalInstance().start(ImageDecodeTask(data, self._snapshotDecoded.emit))
+        else:
+            pass  # TODO: Handle errors
 
+    def _onSnapshotDecoded(self, image):
+        if not self._camera_active or image.isNull():
+            return
+        self._camera_image = image
+        self.newImage.emit()
+
+    ##  Result from model upload
+    def _onModelUploadReply(self, reply, http_status_code):
+        reply.uploadProgress.disconnect(self._onUploadProgress)
+        self._progress_message.hide()
+
+        body = reply.readAll().data()
+        if not 200 <= http_status_code < 300:
+            Logger.log("w", "Uploading model to Repetier-Server failed: %d %s", http_status_code, body[:200].decode("utf-8", errors = "replace"))
+            return
+
+        try:
+            json_data = _loadJson(body)
+        except ValueError:
+            Logger.log("w", "Received an invalid response (%s) on model upload", http_status_code)
+            return
+
+        location = reply.header(QNetworkRequest.LocationHeader)
+        if http_status_code == 201 and location:
+            Logger.log("d", "Resource created on Repetier-Server instance: %s", location.toString())
+
+        modelList = json_data.get("data") if isinstance(json_data, dict) else None
+        if not isinstance(modelList, list) or not modelList:
+            Logger.log("w", "Received no model list in response to model upload")
+            return
+
+        lastModel = modelList[-1]
+        modelId = lastModel.get("id") if isinstance(lastModel, dict) else None
+        if modelId is None:
+            Logger.log("w", "Received a model without id in response to model upload")
+            return
+
+        # "http://%s:%d%s" % (self._address, self._port, self._path)
+        urlString = self._api_url + '?a=copyModel&data={"id": %s}' % (modelId) 
+        Logger.log("d", "XXX1: modelId: "+str(modelId))
+        url = QUrl(urlString)
+        self._printer_request = self._createRequest(url)
+        self._printer_request.setRawHeader(self._api_header_b, self._api_key_b)
+        self._printer_reply = self._manager.get(self._printer_request)
+        Logger.log("d", "XXX1: modelId: "+str(urlString))
+
+        global_container_stack = Application.getInstance().getGlobalContainerStack()
+        if not self._auto_print:
+            if location:
+                file_name = location.fileName()
+                message = Message(i18n_catalog.i18nc("@info:status", "Saved to Repetier-Server as {0}").format(file_name))
+            else:
+                message = Message(i18n_catalog.i18nc("@info:status", "Saved to Repetier-Server"))
+            message.addAction("open_browser", i18n_catalog.i18nc("@action:button", "Open Repetier-Server..."), "globe",
+                                i18n_catalog.i18nc("@info:tooltip", "Open the Repetier-Server web interface"))
+            message.actionTriggered.connect(self._onMessageActionTriggered)
+            message.show()
+
+    ##  Result from /job command
+    def _onCommandReply(self, reply, http_status_code):
+        if http_status_code == 204:
+            Logger.log("d", "Repetier-Server command accepted")
         else:
-            Logger.log("d", "RepetierServerOutputDevice got an unhandled operation %s", reply.operation())
+            pass  # TODO: Handle errors
 
     def _onUploadProgress(self, bytes_sent, bytes_total):
         if bytes_total > 0: